@@ -10,11 +10,12 @@
 
 import os
 import sys
-import tempfile
 import pickle
 import datetime
 import base64
-import re
+import json
+import logging
+from collections import OrderedDict, namedtuple
 
 import nuke
 import nukescripts
@@ -22,12 +23,138 @@ import nukescripts
 import sgtk
 from sgtk import TankError
 
+# knobs on the Flow Production Tracking Write node whose values are propagated
+# to the same knob on the encapsulated Write node when they change.
+_KNOBS_TO_PROPAGATE = frozenset(["disable"])
+
+# appended to the name of a profile that a node uses but that no longer exists
+_PROFILE_NOT_FOUND_SUFFIX = " [Not Found]"
+
+# the name prefix of the ModifyMetaData nodes used as placeholders for
+# Flow Production Tracking Write nodes
+_PLACEHOLDER_NODE_PREFIX = "ShotgunWriteNodePlaceholder"
+
+# command used to show a directory in the file system for the current platform
+if sgtk.util.is_linux():
+    _SHOW_IN_FS_CMD = 'xdg-open "%s"'
+elif sgtk.util.is_macos():
+    _SHOW_IN_FS_CMD = "open '%s'"
+elif sgtk.util.is_windows():
+    _SHOW_IN_FS_CMD = 'cmd.exe /C start "Folder" "%s"'
+else:
+    _SHOW_IN_FS_CMD = None
+
+# paths only need their slashes converting on platforms that don't use "/"
+_NEEDS_SLASH_FIX = os.path.sep != "/"
+
+# used to indicate that a cached value hasn't been computed yet
+_NOT_CACHED = object()
+
+# flags used to track when the render and proxy paths are being updated
+_UPDATING_RENDER_PATH = 0x1
+_UPDATING_PROXY_PATH = 0x2
+
 
 # Special exception raised when the work file cannot be resolved.
 class TkComputePathError(TankError):
     pass
 
 
+class _LruCache(object):
+    """
+    Simple dictionary-like cache that holds a limited number of items, discarding
+    the least recently used item when it is full.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param max_size:    The maximum number of items to hold in the cache
+        """
+        self._max_size = max_size
+        self._items = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Get the item for the specified key, marking it as the most recently used.
+
+        :param key:     The key of the item to get
+        :param default: The value to return if the key isn't in the cache
+        :returns:       The cached item or the default value
+        """
+        try:
+            self._items.move_to_end(key)
+        except KeyError:
+            return default
+        return self._items[key]
+
+    def __setitem__(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all items from the cache.
+        """
+        self._items.clear()
+
+
+# the values derived from a profile's settings that are needed each time the
+# profile is applied to a node
+_ResolvedProfile = namedtuple(
+    "_ResolvedProfile",
+    [
+        "render_template",
+        "publish_template",
+        "proxy_render_template",
+        "proxy_publish_template",
+        "file_settings_str",
+        "packed_tile_color",
+    ],
+)
+
+
+def _wrap_text(t, line_length):
+    """
+    Wrap text to the line_length number of characters where possible
+    splitting on words
+
+    :param t:           The text to wrap
+    :param line_length: The number of characters to wrap the text at
+    :returns:           A list of the wrapped lines
+    """
+    lines = []
+    this_line = ""
+    for part in t.split(" "):
+        if len(part) >= line_length:
+            if this_line:
+                lines.append(this_line)
+                this_line = ""
+            lines.append(part)
+        else:
+            this_line = " ".join([this_line, part]) if this_line else part
+            if len(this_line) >= line_length:
+                lines.append(this_line)
+                this_line = ""
+    if this_line:
+        lines.append(this_line)
+    return lines
+
+
+def _copy_knob_value(src_knob, dst_knob):
+    """
+    Copy the value of one knob to another.  The value is only set if it's different
+    as setting a knob marks it as changed and can trigger further callbacks.
+
+    :param src_knob:    The knob to copy the value from
+    :param dst_knob:    The knob to copy the value to
+    """
+    value = src_knob.value()
+    if dst_knob.value() != value:
+        dst_knob.setValue(value)
+
+
 class TankWriteNodeHandler(object):
     """
     Handles requests and processing from a tank write node.
@@ -40,6 +167,103 @@ class TankWriteNodeHandler(object):
     OUTPUT_KNOB_NAME = "tank_channel"
     USE_NAME_AS_OUTPUT_KNOB_NAME = "tk_use_name_as_channel"
 
+    # knobs that shouldn't be copied from the internal Write node when converting
+    # to a regular Write node:
+    SG_TO_NUKE_SKIP_KNOBS = frozenset(
+        [
+            "file_type",
+            "file",
+            "proxy",
+            "beforeRender",
+            "afterRender",
+            "name",
+            "xpos",
+            "ypos",
+        ]
+    )
+    # knobs that shouldn't be copied to the internal Write node when converting
+    # back from a regular Write node:
+    NUKE_TO_SG_SKIP_KNOBS = SG_TO_NUKE_SKIP_KNOBS.union(
+        ["disable", "tile_color", "postage_stamp", "label"]
+    )
+    # knobs explicitly copied from the Flow Production Tracking Write node to the
+    # regular Write node and back again:
+    SG_TO_NUKE_COPY_KNOBS = ("tile_color", "postage_stamp", "label")
+    NUKE_TO_SG_COPY_KNOBS = ("disable", "tile_color", "postage_stamp")
+    # the knobs added to a regular Write node to store the Toolkit specific
+    # information so that it can be converted back again later.  Each entry is
+    # the nuke knob class, the knob name and the name of the knob on the
+    # Flow Production Tracking Write node it is populated from:
+    SG_TO_NUKE_TOOLKIT_KNOBS = (
+        # profile
+        (nuke.String_Knob, "tk_profile_name", "profile_name"),
+        # output
+        (nuke.String_Knob, "tk_output", OUTPUT_KNOB_NAME),
+        # use node name for output
+        (nuke.Boolean_Knob, USE_NAME_AS_OUTPUT_KNOB_NAME, USE_NAME_AS_OUTPUT_KNOB_NAME),
+        # templates
+        (nuke.String_Knob, "tk_render_template", "render_template"),
+        (nuke.String_Knob, "tk_publish_template", "publish_template"),
+        (nuke.String_Knob, "tk_proxy_render_template", "proxy_render_template"),
+        (nuke.String_Knob, "tk_proxy_publish_template", "proxy_publish_template"),
+    )
+
+    # the names of the link knobs stashed on the gizmo for promoting knobs from
+    # the internal Write node:
+    PROMOTED_LINK_KNOB_NAMES = tuple("_promoted_%d" % i for i in range(20))
+
+    # template fields that are free to change without locking the render path:
+    PATH_LOCK_IGNORED_FIELDS = frozenset(("width", "height", "YYYY", "MM", "DD"))
+
+    # fields that are the same for every render path - force use of the %d format
+    # for nuke renders and use %V (full view printout) as default for the eye field:
+    RENDER_PATH_FIXED_FIELDS = (("SEQ", "FORMAT: %d"), ("eye", "%V"))
+
+    # the template keys the output name can be used for - 'channel' is supported
+    # for backwards compatibility:
+    OUTPUT_KEY_NAMES = ("output", "channel")
+
+    # warnings displayed in the property editor, wrapped ready for display:
+    FROZEN_PATH_WARNING_HTML = "<br>".join(
+        _wrap_text(
+            "The render path is currently frozen because Toolkit could not "
+            "determine a valid path!  This was due to the following problem:",
+            60,
+        )
+    )
+    FROZEN_PATH_RENDER_HINT_HTML = "<br>".join(
+        _wrap_text(
+            "You can still render to the frozen path but you won't be able to "
+            "publish this node!",
+            60,
+        )
+    )
+    LOCKED_PATH_WARNING_HTML = "<br>".join(
+        _wrap_text(
+            "The path does not match the current PTR Work Area.  You can "
+            "still render but you will not be able to publish this node.",
+            60,
+        )
+    )
+    LOCKED_PATH_RESET_HINT_HTML = "<br>".join(
+        _wrap_text(
+            "The path will be automatically reset next time you version-up, publish "
+            "or click 'Reset Path'.",
+            60,
+        )
+    )
+    PROXY_OVERWRITE_WARNING_HTML = (
+        "<i style='color:orange'><b>Warning</b> <br>%s<i><br>"
+        % "<br>".join(
+            _wrap_text(
+                "The full & proxy resolution render paths are currently the same.  "
+                "Rendering in proxy mode will overwrite any previously rendered "
+                "full-res frames!",
+                60,
+            )
+        )
+    )
+
     ################################################################################################
     # Construction
 
@@ -52,15 +276,85 @@ class TankWriteNodeHandler(object):
 
         # cache the profiles:
         self._promoted_knobs = {}
-        self._profile_names = []
+        self._profile_names = ()
         self._profiles = {}
+        # values derived from each profile's settings that are used whenever the
+        # profile is applied to a node:
+        self.__resolved_profiles = {}
+        # templates looked up by the names cached on nodes whose profile no
+        # longer exists:
+        self.__templates_by_name = {}
 
         self.__currently_rendering_nodes = set()
         self.__node_computed_path_settings_cache = {}
-        self.__path_preview_cache = {}
+        # recently computed render paths for the settings they were computed from.
+        # These depend on the context so the cache is cleared when that changes:
+        self.__computed_render_paths = _LruCache(128)
+        self.__computed_render_paths_context = None
+        # the context fields for each render template.  These are also cleared
+        # when the context changes:
+        self.__context_fields = {}
+        # the parts of each render path shown in the path preview.  The parts
+        # depend on the context so the cache is cleared when that changes:
+        self.__path_preview_cache = _LruCache(512)
+        self.__path_preview_context = None
+        # text that has been wrapped for display in the property editor:
+        self.__wrapped_text_cache = _LruCache(64)
+        # the fields recently extracted from paths using the render templates:
+        self.__template_fields_cache = _LruCache(256)
+        # the entity locations for the context they were found for, normalized
+        # and sorted so that the longest (most specific) location is first:
+        self.__entity_locations_context = None
+        self.__entity_locations = ()
         # flags to track when the render and proxy paths are being updated.
-        self.__is_updating_render_path = False
-        self.__is_updating_proxy_path = False
+        self.__updating_paths = 0
+        # the path the script was last saved to - used to avoid re-checking
+        # every node for a new script path when the script is saved over.
+        self.__last_save_path = None
+        # cached list of the Flow Production Tracking Write nodes in the current
+        # script.  This is only used once callbacks have been added as these are
+        # needed to invalidate it when nodes are created or destroyed.
+        self.__nodes_cache = None
+        self.__is_tracking_nodes = False
+        # the current script path - as with the nodes cache, this is only used
+        # once callbacks have been added:
+        self.__script_path_cache = _NOT_CACHED
+        # the work fields last extracted from a script path together with the
+        # script template and path they were extracted from:
+        self.__script_fields_cache = (None, None, {})
+        # per-node cache of the profile name each node is using and the
+        # settings for that profile:
+        self.__node_profile_names = {}
+        self.__node_profile_settings = {}
+        # per-profile cache of whether the output key is used by its templates:
+        self.__profile_output_used = {}
+        # the profile settings and context last applied to each node:
+        self.__applied_profiles = {}
+        # the profile names last set on each node's profile list:
+        self.__node_profile_lists = {}
+        # per-node record of the state last used to update the path preview
+        # knobs so that they are only updated when something has changed:
+        self.__applied_path_previews = {}
+        # per-node record of the warnings last displayed on each node:
+        self.__applied_path_warnings = {}
+        # per-node record of the write node settings last serialized when the
+        # script was saved, together with the encoded settings:
+        self.__serialized_write_node_settings = {}
+        # per-node record of the last render path lock check:
+        self.__path_lock_results = {}
+        # per-node cache of the knobs looked up whenever a node is updated:
+        self.__node_knobs = {}
+
+        # the handlers for the knobs on the Flow Production Tracking Write node that
+        # need handling when their value changes - changes to any other knob are ignored.
+        self.__knob_changed_handlers = {
+            "tk_profile_list": self.__on_profile_list_changed,
+            TankWriteNodeHandler.OUTPUT_KNOB_NAME: self.__on_output_changed,
+            "name": self.__on_name_changed,
+            TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME: self.__on_use_name_as_output_changed,
+        }
+        for knob_name in _KNOBS_TO_PROPAGATE:
+            self.__knob_changed_handlers[knob_name] = self.__on_propagated_knob_changed
 
         self.populate_profiles_from_settings()
 
@@ -70,7 +364,7 @@ class TankWriteNodeHandler(object):
     @property
     def profile_names(self):
         """
-        return the list of available profile names
+        return the tuple of available profile names
         """
         return self._profile_names
 
@@ -82,7 +376,12 @@ class TankWriteNodeHandler(object):
         Sources profile definitions from the current app settings.
         """
         self._profiles = {}
-        self._profile_names = []
+        self.__resolved_profiles = {}
+        self.__templates_by_name = {}
+        self.__node_profile_settings = {}
+        self.__profile_output_used = {}
+        self.__applied_profiles = {}
+        profile_names = []
 
         for profile in self._app.get_setting("write_nodes", []):
             name = profile["name"]
@@ -93,28 +392,47 @@ class TankWriteNodeHandler(object):
                 )
                 continue
 
-            self._profile_names.append(name)
+            profile_names.append(name)
             self._profiles[name] = profile
+            self.__resolved_profiles[name] = self.__resolve_profile(profile)
+
+        # the templates may have been reloaded:
+        self.__template_fields_cache.clear()
+
+        # keep an immutable copy of the ordered names - membership tests should
+        # use the profiles dictionary instead:
+        self._profile_names = tuple(profile_names)
 
     def populate_script_template(self):
         """
         Sources the current context's work file template from the parent app.
         """
         self._script_template = self._app.get_template("template_script_work")
+        self.__script_path_cache = _NOT_CACHED
+        self.__computed_render_paths.clear()
 
     def get_nodes(self):
         """
         Returns a list of tank write nodes
         """
-        if nuke.exists("root"):
-            return nuke.allNodes(
-                group=nuke.root(),
-                filter=TankWriteNodeHandler.SG_WRITE_NODE_CLASS,
-                recurseGroups=True,
-            )
-        else:
+        if self.__nodes_cache is not None:
+            # return a copy as the caller may delete nodes whilst iterating over it!
+            return list(self.__nodes_cache)
+
+        # the cache is always cleared when the script is closed so it's only
+        # necessary to check that the root node exists when it's empty:
+        if not nuke.exists("root"):
             return []
 
+        nodes = nuke.allNodes(
+            group=nuke.root(),
+            filter=TankWriteNodeHandler.SG_WRITE_NODE_CLASS,
+            recurseGroups=True,
+        )
+        if self.__is_tracking_nodes:
+            self.__nodes_cache = list(nodes)
+        return nodes
+
     def get_node_name(self, node):
         """
         Return the name for the specified node
@@ -125,7 +443,11 @@ class TankWriteNodeHandler(object):
         """
         Return the name of the profile the specified node is using
         """
-        return node.knob("profile_name").value()
+        profile_name = self.__node_profile_names.get(node)
+        if profile_name is None:
+            profile_name = node.knob("profile_name").value()
+            self.__node_profile_names[node] = profile_name
+        return profile_name
 
     def get_node_tank_type(self, node):
         """
@@ -214,12 +536,21 @@ class TankWriteNodeHandler(object):
         """
         is_proxy = node.proxy()
         self.__update_render_path(node, force_reset=True, is_proxy=is_proxy)
-        self.__update_render_path(node, force_reset=True, is_proxy=(not is_proxy))
+        # when the node doesn't have a proxy template, both paths are computed from
+        # the same settings so the path that was just computed can be re-used:
+        self.__update_render_path(
+            node, force_reset=True, is_proxy=(not is_proxy), reuse_other_path=True
+        )
 
-    def create_new_node(self, profile_name):
+    def create_new_node(self, profile_name, existing_node_names=None):
         """
         Creates a new write node
 
+        :param profile_name:        The name of the profile to use for the new node
+        :param existing_node_names: Optional set of the existing node names that start
+                                    with the default node name.  If specified, this is
+                                    used instead of searching the script for them and
+                                    the new node's name is added to it.
         :returns: a node object.
         """
         curr_filename = self.__get_current_script_path()
@@ -239,15 +570,19 @@ class TankWriteNodeHandler(object):
         node = nuke.createNode(TankWriteNodeHandler.SG_WRITE_NODE_CLASS)
 
         # rename to our new default name:
-        existing_node_names = [n.name() for n in nuke.allNodes()]
+        default_name = TankWriteNodeHandler.SG_WRITE_DEFAULT_NAME
+        if existing_node_names is None:
+            existing_node_names = self.__find_default_node_names()
+        elif node.name().startswith(default_name):
+            # the names were found before this node was created:
+            existing_node_names.add(node.name())
         postfix = 1
-        while True:
-            new_name = "%s%d" % (TankWriteNodeHandler.SG_WRITE_DEFAULT_NAME, postfix)
-            if new_name not in existing_node_names:
-                node.knob("name").setValue(new_name)
-                break
-            else:
-                postfix += 1
+        new_name = "%s%d" % (default_name, postfix)
+        while new_name in existing_node_names:
+            postfix += 1
+            new_name = "%s%d" % (default_name, postfix)
+        node.knob("name").setValue(new_name)
+        existing_node_names.add(new_name)
 
         self._app.log_debug("Created PTR Write Node %s" % node.name())
 
@@ -262,17 +597,19 @@ class TankWriteNodeHandler(object):
         """
         self._app.log_debug("Looking for placeholder nodes to process...")
 
-        node_found = False
-        for n in nuke.allNodes("ModifyMetaData"):
-            if not n.name().startswith("ShotgunWriteNodePlaceholder"):
-                continue
+        # find the placeholder nodes up front so that only they are processed:
+        placeholder_nodes = [
+            n
+            for n in nuke.allNodes("ModifyMetaData")
+            if n.name().startswith(_PLACEHOLDER_NODE_PREFIX)
+        ]
 
-            self._app.log_debug("Found ShotgunWriteNodePlaceholder node: %s" % n)
+        node_found = False
+        existing_node_names = None
+        for n in placeholder_nodes:
+            self._app.log_debug("Found %s node: %s" % (_PLACEHOLDER_NODE_PREFIX, n))
             metadata = n.metadata()
             profile_name = metadata.get("name")
-            output_name = metadata.get("output") or metadata.get(
-                "channel"
-            )  # for backwards compatibility
 
             # Make sure the profile is valid:
             if profile_name not in self._profiles:
@@ -281,6 +618,9 @@ class TankWriteNodeHandler(object):
                 )
                 continue
 
+            # fall back to 'channel' for backwards compatibility:
+            output_name = metadata.get("output") or metadata.get("channel")
+
             # try and ensure we're connected to the tree after we delete the nodes
             if not node_found:
                 node_found = True
@@ -289,8 +629,11 @@ class TankWriteNodeHandler(object):
                 except:
                     pass
 
-            # create the node:
-            new_node = self.create_new_node(profile_name)
+            # create the node - the existing node names are only found once and then
+            # kept up to date as each new node is created:
+            if existing_node_names is None:
+                existing_node_names = self.__find_default_node_names()
+            new_node = self.create_new_node(profile_name, existing_node_names)
 
             # set the output:
             self.__set_output(new_node, output_name)
@@ -313,25 +656,39 @@ class TankWriteNodeHandler(object):
             # write gizmo that does not have the create thumbnail node
             return None
         th_node.knob("disable").setValue(False)
+        file_knob = th_node.knob("file")
+        # the proxy path is only rendered to when the script is in proxy mode:
+        proxy_knob = th_node.knob("proxy") if node.proxy() else None
+
+        # thumbnails are only generated when publishing so tempfile is imported here
+        # rather than whenever the handler is loaded:
+        import tempfile
 
-        png_path = tempfile.NamedTemporaryFile(
-            suffix=".png", prefix="tanktmp", delete=False
-        ).name
+        # create the temp file but close it straight away as only the path is needed:
+        fd, png_path = tempfile.mkstemp(suffix=".png", prefix="tanktmp")
+        os.close(fd)
 
         # set render output - make sure to use a path with slashes on all OSes
-        th_node.knob("file").setValue(png_path.replace(os.path.sep, "/"))
-        th_node.knob("proxy").setValue(png_path.replace(os.path.sep, "/"))
+        nuke_png_path = png_path
+        if _NEEDS_SLASH_FIX:
+            nuke_png_path = png_path.replace(os.path.sep, "/")
+        file_knob.setValue(nuke_png_path)
+        if proxy_knob:
+            proxy_knob.setValue(nuke_png_path)
 
         # and finally render!
         try:
+            # always render the first view we find.
+            first_view = nuke.views()[0]
+
             # pick mid frame
-            current_in = nuke.root()["first_frame"].value()
-            current_out = nuke.root()["last_frame"].value()
+            root = nuke.root()
+            current_in = root["first_frame"].value()
+            current_out = root["last_frame"].value()
             frame_to_render = (current_out - current_in) / 2 + current_in
             frame_to_render = int(frame_to_render)
             render_node_name = "%s.create_thumbnail" % node.name()
-            # and do it - always render the first view we find.
-            first_view = nuke.views()[0]
+            # and do it
             nuke.execute(
                 render_node_name,
                 start=frame_to_render,
@@ -349,8 +706,9 @@ class TankWriteNodeHandler(object):
             png_path = None
         finally:
             # reset paths
-            th_node.knob("file").setValue("")
-            th_node.knob("proxy").setValue("")
+            file_knob.setValue("")
+            if proxy_knob:
+                proxy_knob.setValue("")
             th_node.knob("disable").setValue(True)
 
         return png_path
@@ -359,6 +717,11 @@ class TankWriteNodeHandler(object):
         """
         Add callbacks to watch for certain events:
         """
+        # script load callback used to reset any state cached for the
+        # previously open script.  This needs to run before any other
+        # script load callbacks that may use that state.
+        nuke.addOnScriptLoad(self.__on_script_load, nodeClass="Root")
+
         # add callback to check for placeholder nodes
         nuke.addOnScriptLoad(self.process_placeholder_nodes, nodeClass="Root")
 
@@ -372,6 +735,15 @@ class TankWriteNodeHandler(object):
             self.__on_user_create, nodeClass=TankWriteNodeHandler.SG_WRITE_NODE_CLASS
         )
 
+        # node create & destroy callbacks used to keep the cached list of
+        # nodes returned by get_nodes() up to date
+        nuke.addOnCreate(
+            self.__on_node_create, nodeClass=TankWriteNodeHandler.SG_WRITE_NODE_CLASS
+        )
+        nuke.addOnDestroy(self.__on_node_destroy)
+        nuke.addOnScriptClose(self.__on_script_close, nodeClass="Root")
+        self.__is_tracking_nodes = True
+
         # set up all existing nodes:
         for n in self.get_nodes():
             self.setup_new_node(n)
@@ -381,10 +753,19 @@ class TankWriteNodeHandler(object):
         Removed previously added callbacks
         """
         nuke.removeOnScriptLoad(self.process_placeholder_nodes, nodeClass="Root")
+        nuke.removeOnScriptLoad(self.__on_script_load, nodeClass="Root")
         nuke.removeOnScriptSave(self.__on_script_save)
         nuke.removeOnUserCreate(
             self.__on_user_create, nodeClass=TankWriteNodeHandler.SG_WRITE_NODE_CLASS
         )
+        nuke.removeOnCreate(
+            self.__on_node_create, nodeClass=TankWriteNodeHandler.SG_WRITE_NODE_CLASS
+        )
+        nuke.removeOnDestroy(self.__on_node_destroy)
+        nuke.removeOnScriptClose(self.__on_script_close, nodeClass="Root")
+        self.__is_tracking_nodes = False
+        self.__nodes_cache = None
+        self.__script_path_cache = _NOT_CACHED
 
     def convert_sg_to_nuke_write_nodes(self):
         """
@@ -406,101 +787,77 @@ class TankWriteNodeHandler(object):
 
         # get write nodes:
         sg_write_nodes = self.get_nodes()
-        for sg_wn in sg_write_nodes:
-            # set as selected:
-            sg_wn.setSelected(True)
-            node_name = sg_wn.name()
-            node_pos = (sg_wn.xpos(), sg_wn.ypos())
-
-            # create new regular Write node:
-            new_wn = nuke.createNode("Write")
-            new_wn.setSelected(False)
-
-            # copy across file & proxy knobs (if we've defined a proxy template):
-            new_wn["file"].setValue(sg_wn["cached_path"].evaluate())
-            if sg_wn["proxy_render_template"].value():
-                new_wn["proxy"].setValue(sg_wn["tk_cached_proxy_path"].evaluate())
-            else:
-                new_wn["proxy"].setValue("")
-
-            # make sure file_type is set properly:
-            int_wn = sg_wn.node(TankWriteNodeHandler.WRITE_NODE_NAME)
-            new_wn["file_type"].setValue(int_wn["file_type"].value())
-
-            # copy across any knob values from the internal write node.
-            for knob_name, knob in int_wn.knobs().items():
-                # skip knobs we don't want to copy:
-                if knob_name in [
-                    "file_type",
-                    "file",
-                    "proxy",
-                    "beforeRender",
-                    "afterRender",
-                    "name",
-                    "xpos",
-                    "ypos",
-                ]:
-                    continue
-
-                if knob_name in new_wn.knobs():
-                    try:
-                        new_wn[knob_name].setValue(knob.value())
-                    except TypeError:
-                        # ignore type errors:
-                        pass
-
-            # Set the nuke write node to have create directories ticked on by default
-            # As toolkit hasn't created the output folder at this point.
-            new_wn["create_directories"].setValue(True)
-
-            # copy across select knob values from the Flow Production Tracking Write node:
-            for knob_name in ["tile_color", "postage_stamp", "label"]:
-                new_wn[knob_name].setValue(sg_wn[knob_name].value())
-
-            # Store Toolkit specific information on write node
-            # so that we can reverse this process later
-
-            # profile
-            knob = nuke.String_Knob("tk_profile_name")
-            knob.setValue(sg_wn["profile_name"].value())
-            new_wn.addKnob(knob)
-
-            # output
-            knob = nuke.String_Knob("tk_output")
-            knob.setValue(sg_wn[TankWriteNodeHandler.OUTPUT_KNOB_NAME].value())
-            new_wn.addKnob(knob)
-
-            # use node name for output
-            knob = nuke.Boolean_Knob(TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME)
-            knob.setValue(
-                sg_wn[TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME].value()
-            )
-            new_wn.addKnob(knob)
 
-            # templates
-            knob = nuke.String_Knob("tk_render_template")
-            knob.setValue(sg_wn["render_template"].value())
-            new_wn.addKnob(knob)
-
-            knob = nuke.String_Knob("tk_publish_template")
-            knob.setValue(sg_wn["publish_template"].value())
-            new_wn.addKnob(knob)
-
-            knob = nuke.String_Knob("tk_proxy_render_template")
-            knob.setValue(sg_wn["proxy_render_template"].value())
-            new_wn.addKnob(knob)
-
-            knob = nuke.String_Knob("tk_proxy_publish_template")
-            knob.setValue(sg_wn["proxy_publish_template"].value())
-            new_wn.addKnob(knob)
-
-            # delete original node:
-            nuke.delete(sg_wn)
-
-            # rename new node:
-            new_wn.setName(node_name)
-            new_wn.setXpos(node_pos[0])
-            new_wn.setYpos(node_pos[1])
+        # convert all nodes as a single undo step.  The original nodes are deleted
+        # and the new nodes renamed once all nodes have been converted:
+        converted_nodes = []
+        undo = nuke.Undo()
+        undo.begin("Convert to Write Nodes")
+        try:
+            for sg_wn in sg_write_nodes:
+                # set as selected:
+                sg_wn.setSelected(True)
+                node_name = sg_wn.name()
+                node_pos = (sg_wn.xpos(), sg_wn.ypos())
+                sg_wn_knobs = sg_wn.knobs()
+                proxy_render_template = sg_wn_knobs["proxy_render_template"].value()
+
+                # create new regular Write node:
+                new_wn = nuke.createNode("Write")
+                new_wn.setSelected(False)
+
+                # copy across file & proxy knobs (if we've defined a proxy template):
+                new_wn["file"].setValue(sg_wn_knobs["cached_path"].evaluate())
+                if proxy_render_template:
+                    new_wn["proxy"].setValue(
+                        sg_wn_knobs["tk_cached_proxy_path"].evaluate()
+                    )
+                else:
+                    new_wn["proxy"].setValue("")
+
+                # make sure file_type is set properly:
+                int_wn = sg_wn.node(TankWriteNodeHandler.WRITE_NODE_NAME)
+                new_wn["file_type"].setValue(int_wn["file_type"].value())
+
+                # copy across any knob values from the internal write node.
+                new_wn_knobs = new_wn.knobs()
+                for knob_name, knob in int_wn.knobs().items():
+                    # skip knobs we don't want to copy:
+                    if knob_name in TankWriteNodeHandler.SG_TO_NUKE_SKIP_KNOBS:
+                        continue
+
+                    new_knob = new_wn_knobs.get(knob_name)
+                    if new_knob is not None:
+                        try:
+                            _copy_knob_value(knob, new_knob)
+                        except TypeError:
+                            # ignore type errors:
+                            pass
+
+                # Set the nuke write node to have create directories ticked on by default
+                # As toolkit hasn't created the output folder at this point.
+                new_wn["create_directories"].setValue(True)
+
+                # copy across select knob values from the Flow Production Tracking Write node:
+                for knob_name in TankWriteNodeHandler.SG_TO_NUKE_COPY_KNOBS:
+                    _copy_knob_value(sg_wn_knobs[knob_name], new_wn_knobs[knob_name])
+
+                # Store Toolkit specific information on write node
+                # so that we can reverse this process later
+                for (
+                    knob_class,
+                    knob_name,
+                    sg_knob_name,
+                ) in TankWriteNodeHandler.SG_TO_NUKE_TOOLKIT_KNOBS:
+                    knob = knob_class(knob_name)
+                    knob.setValue(sg_wn_knobs[sg_knob_name].value())
+                    new_wn.addKnob(knob)
+
+                converted_nodes.append((sg_wn, new_wn, node_name, node_pos))
+
+            self.__replace_converted_nodes(converted_nodes)
+        finally:
+            undo.end()
 
     def convert_nuke_to_sg_write_nodes(self):
         """
@@ -523,107 +880,103 @@ class TankWriteNodeHandler(object):
         write_nodes = nuke.allNodes(
             group=nuke.root(), filter="Write", recurseGroups=True
         )
-        for wn in write_nodes:
-            # look for additional toolkit knobs:
-            profile_knob = wn.knob("tk_profile_name")
-            output_knob = wn.knob("tk_output")
-            use_name_as_output_knob = wn.knob(
-                TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME
-            )
-            render_template_knob = wn.knob("tk_render_template")
-            publish_template_knob = wn.knob("tk_publish_template")
-            proxy_render_template_knob = wn.knob("tk_proxy_render_template")
-            proxy_publish_template_knob = wn.knob("tk_proxy_publish_template")
 
-            if (
-                not profile_knob
-                or not output_knob
-                or not use_name_as_output_knob
-                or not render_template_knob
-                or not publish_template_knob
-                or not proxy_render_template_knob
-                or not proxy_publish_template_knob
-            ):
-                # can't convert to a Shotgun Write Node as we have missing parameters!
-                continue
+        # convert all nodes as a single undo step.  The original nodes are deleted
+        # and the new nodes renamed once all nodes have been converted:
+        converted_nodes = []
+        undo = nuke.Undo()
+        undo.begin("Convert from Write Nodes")
+        try:
+            for wn in write_nodes:
+                # look for additional toolkit knobs:
+                wn_knobs = wn.knobs()
+                profile_knob = wn_knobs.get("tk_profile_name")
+                output_knob = wn_knobs.get("tk_output")
+                use_name_as_output_knob = wn_knobs.get(
+                    TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME
+                )
+                render_template_knob = wn_knobs.get("tk_render_template")
+                publish_template_knob = wn_knobs.get("tk_publish_template")
+                proxy_render_template_knob = wn_knobs.get("tk_proxy_render_template")
+                proxy_publish_template_knob = wn_knobs.get("tk_proxy_publish_template")
 
-            # set as selected:
-            wn.setSelected(True)
-            node_name = wn.name()
-            node_pos = (wn.xpos(), wn.ypos())
-
-            # create new Flow Production Tracking Write node:
-            new_sg_wn = nuke.createNode(TankWriteNodeHandler.SG_WRITE_NODE_CLASS)
-            new_sg_wn.setSelected(False)
-
-            # copy across file & proxy knobs as well as all cached templates:
-            new_sg_wn["cached_path"].setValue(wn["file"].value())
-            new_sg_wn["tk_cached_proxy_path"].setValue(wn["proxy"].value())
-            new_sg_wn["render_template"].setValue(render_template_knob.value())
-            new_sg_wn["publish_template"].setValue(publish_template_knob.value())
-            new_sg_wn["proxy_render_template"].setValue(
-                proxy_render_template_knob.value()
-            )
-            new_sg_wn["proxy_publish_template"].setValue(
-                proxy_publish_template_knob.value()
-            )
+                if (
+                    not profile_knob
+                    or not output_knob
+                    or not use_name_as_output_knob
+                    or not render_template_knob
+                    or not publish_template_knob
+                    or not proxy_render_template_knob
+                    or not proxy_publish_template_knob
+                ):
+                    # can't convert to a Shotgun Write Node as we have missing parameters!
+                    continue
 
-            # set the profile & output - this will cause the paths to be reset:
-            # Note, we don't call the method __set_profile() as we don't want to
-            # run all the normal logic that runs as part of switching the profile.
-            # Instead we want this node to be rebuilt as close as possible to the
-            # original before it was converted to a regular Nuke write node.
-            profile_name = profile_knob.value()
-            new_sg_wn["profile_name"].setValue(profile_name)
-            new_sg_wn["tk_profile_list"].setValue(profile_name)
-            new_sg_wn[TankWriteNodeHandler.OUTPUT_KNOB_NAME].setValue(
-                output_knob.value()
-            )
-            new_sg_wn[TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME].setValue(
-                use_name_as_output_knob.value()
-            )
+                # set as selected:
+                wn.setSelected(True)
+                node_name = wn.name()
+                node_pos = (wn.xpos(), wn.ypos())
+
+                # create new Flow Production Tracking Write node:
+                new_sg_wn = nuke.createNode(TankWriteNodeHandler.SG_WRITE_NODE_CLASS)
+                new_sg_wn.setSelected(False)
+
+                # copy across file & proxy knobs as well as all cached templates:
+                new_sg_wn["cached_path"].setValue(wn_knobs["file"].value())
+                new_sg_wn["tk_cached_proxy_path"].setValue(wn_knobs["proxy"].value())
+                new_sg_wn["render_template"].setValue(render_template_knob.value())
+                new_sg_wn["publish_template"].setValue(publish_template_knob.value())
+                new_sg_wn["proxy_render_template"].setValue(
+                    proxy_render_template_knob.value()
+                )
+                new_sg_wn["proxy_publish_template"].setValue(
+                    proxy_publish_template_knob.value()
+                )
 
-            # make sure file_type is set properly:
-            int_wn = new_sg_wn.node(TankWriteNodeHandler.WRITE_NODE_NAME)
-            int_wn["file_type"].setValue(wn["file_type"].value())
-
-            # copy across and knob values from the internal write node.
-            for knob_name, knob in wn.knobs().items():
-                # skip knobs we don't want to copy:
-                if knob_name in [
-                    "file_type",
-                    "file",
-                    "proxy",
-                    "beforeRender",
-                    "afterRender",
-                    "name",
-                    "xpos",
-                    "ypos",
-                    "disable",
-                    "tile_color",
-                    "postage_stamp",
-                    "label",
-                ]:
-                    continue
+                # set the profile & output - this will cause the paths to be reset:
+                # Note, we don't call the method __set_profile() as we don't want to
+                # run all the normal logic that runs as part of switching the profile.
+                # Instead we want this node to be rebuilt as close as possible to the
+                # original before it was converted to a regular Nuke write node.
+                profile_name = profile_knob.value()
+                new_sg_wn["profile_name"].setValue(profile_name)
+                self.__forget_node_profile(new_sg_wn)
+                new_sg_wn["tk_profile_list"].setValue(profile_name)
+                new_sg_wn[TankWriteNodeHandler.OUTPUT_KNOB_NAME].setValue(
+                    output_knob.value()
+                )
+                new_sg_wn[TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME].setValue(
+                    use_name_as_output_knob.value()
+                )
 
-                if knob_name in int_wn.knobs():
-                    try:
-                        int_wn[knob_name].setValue(knob.value())
-                    except TypeError:
-                        # ignore type errors:
-                        pass
+                # make sure file_type is set properly:
+                int_wn = new_sg_wn.node(TankWriteNodeHandler.WRITE_NODE_NAME)
+                int_wn["file_type"].setValue(wn_knobs["file_type"].value())
 
-            # explicitly copy some settings to the new Shotgun Write Node instead:
-            for knob_name in ["disable", "tile_color", "postage_stamp"]:
-                new_sg_wn[knob_name].setValue(wn[knob_name].value())
+                # copy across and knob values from the internal write node.
+                int_wn_knobs = int_wn.knobs()
+                for knob_name, knob in wn_knobs.items():
+                    # skip knobs we don't want to copy:
+                    if knob_name in TankWriteNodeHandler.NUKE_TO_SG_SKIP_KNOBS:
+                        continue
 
-            # delete original node:
-            nuke.delete(wn)
+                    int_knob = int_wn_knobs.get(knob_name)
+                    if int_knob is not None:
+                        try:
+                            _copy_knob_value(knob, int_knob)
+                        except TypeError:
+                            # ignore type errors:
+                            pass
 
-            # rename new node:
-            new_sg_wn.setName(node_name)
-            new_sg_wn.setXpos(node_pos[0])
-            new_sg_wn.setYpos(node_pos[1])
+                # explicitly copy some settings to the new Shotgun Write Node instead:
+                for knob_name in TankWriteNodeHandler.NUKE_TO_SG_COPY_KNOBS:
+                    _copy_knob_value(wn_knobs[knob_name], new_sg_wn[knob_name])
+
+                converted_nodes.append((wn, new_sg_wn, node_name, node_pos))
+
+            self.__replace_converted_nodes(converted_nodes)
+        finally:
+            undo.end()
 
     ################################################################################################
     # Public methods called from gizmo - although these are public, they should
@@ -706,7 +1059,8 @@ class TankWriteNodeHandler(object):
         if render_path:
             # the above method returns nuke style slashes, so ensure these
             # are pointing correctly
-            render_path = render_path.replace(os.path.sep, "/")
+            if _NEEDS_SLASH_FIX:
+                render_path = render_path.replace(os.path.sep, "/")
 
             dir_name = os.path.dirname(render_path)
             if os.path.exists(dir_name):
@@ -732,14 +1086,9 @@ class TankWriteNodeHandler(object):
         # if we have a valid render path then show it:
         if render_dir:
             # run the app
-            if sgtk.util.is_linux():
-                cmd = 'xdg-open "%s"' % render_dir
-            elif sgtk.util.is_macos():
-                cmd = "open '%s'" % render_dir
-            elif sgtk.util.is_windows():
-                cmd = 'cmd.exe /C start "Folder" "%s"' % render_dir
-            else:
+            if not _SHOW_IN_FS_CMD:
                 raise Exception("Platform '%s' is not supported." % sys.platform)
+            cmd = _SHOW_IN_FS_CMD % render_dir
 
             self._app.log_debug("Executing command '%s'" % cmd)
             exit_code = os.system(cmd)
@@ -783,28 +1132,29 @@ class TankWriteNodeHandler(object):
 
         views = node.knob("views").value().split()
 
-        if len(views) < 2:
-            # check if proxy render or not
-            if nuke.root()["proxy"].value():
-                # proxy mode
-                out_file = node.knob("proxy").evaluate()
-            else:
-                out_file = node.knob("file").evaluate()
+        # check if proxy render or not
+        if nuke.root()["proxy"].value():
+            # proxy mode
+            out_knob = node.knob("proxy")
+        else:
+            out_knob = node.knob("file")
 
+        if len(views) < 2:
+            out_file = out_knob.evaluate()
             out_dir = os.path.dirname(out_file)
             self._app.ensure_folder_exists(out_dir)
 
         else:
-            # stereo or odd number of views...
+            # stereo or odd number of views - the views will often render to
+            # the same directory so only make sure each directory exists once:
+            seen_dirs = set()
+            evaluate = out_knob.evaluate
             for view in views:
-                if nuke.root()["proxy"].value():
-                    # proxy mode
-                    out_file = node.knob("proxy").evaluate(view=view)
-                else:
-                    out_file = node.knob("file").evaluate(view=view)
-
+                out_file = evaluate(view=view)
                 out_dir = os.path.dirname(out_file)
-                self._app.ensure_folder_exists(out_dir)
+                if out_dir not in seen_dirs:
+                    seen_dirs.add(out_dir)
+                    self._app.ensure_folder_exists(out_dir)
 
         # add group/parent to list of currently rendering nodes:
         grp = nuke.thisGroup()
@@ -854,13 +1204,84 @@ class TankWriteNodeHandler(object):
     ################################################################################################
     # Private methods
 
+    def __find_default_node_names(self):
+        """
+        Find the names of the nodes in the current group that could clash with the
+        name given to a new Flow Production Tracking Write node.
+
+        :returns:   A set of the node names that start with the default node name
+        """
+        # only names starting with the default name can clash so there's no need
+        # to keep the others:
+        default_name = TankWriteNodeHandler.SG_WRITE_DEFAULT_NAME
+        return set(
+            name
+            for name in (n.name() for n in nuke.allNodes())
+            if name.startswith(default_name)
+        )
+
+    def __replace_converted_nodes(self, converted_nodes):
+        """
+        Delete the original nodes that have been converted and give their names and
+        positions to the nodes they were converted to.
+
+        :param converted_nodes: List of (original node, new node, name, (xpos, ypos))
+                                tuples for the converted nodes
+        """
+        for original_node, new_node, node_name, node_pos in converted_nodes:
+            # delete original node:
+            nuke.delete(original_node)
+
+            # rename new node:
+            new_node.setName(node_name)
+            new_node.setXpos(node_pos[0])
+            new_node.setYpos(node_pos[1])
+
+    def __resolve_profile(self, profile):
+        """
+        Resolve the values derived from a profile's settings that are needed each
+        time the profile is applied to a node.
+
+        :param profile: The profile settings dictionary
+        :returns:       _ResolvedProfile containing the resolved templates, the file
+                        settings serialized for caching on the node and the packed
+                        tile color (None if the profile doesn't define a valid color)
+        """
+        packed_tile_color = None
+        tile_color = profile["tile_color"]
+        if tile_color and len(tile_color) == 3:
+            # build packed RGB
+            # (Red << 24) + (Green << 16) + (Blue << 8)
+            red, green, blue = (min(max(element, 0), 255) for element in tile_color)
+            packed_tile_color = (red << 24) | (green << 16) | (blue << 8)
+
+        return _ResolvedProfile(
+            render_template=self._app.get_template_by_name(profile["render_template"]),
+            publish_template=self._app.get_template_by_name(
+                profile["publish_template"]
+            ),
+            proxy_render_template=self._app.get_template_by_name(
+                profile["proxy_render_template"]
+            ),
+            proxy_publish_template=self._app.get_template_by_name(
+                profile["proxy_publish_template"]
+            ),
+            file_settings_str=sgtk.util.pickle.dumps(profile["settings"]),
+            packed_tile_color=packed_tile_color,
+        )
+
     def __get_node_profile_settings(self, node):
         """
         Find the profile settings for the specified node
         """
-        profile_name = self.get_node_profile_name(node)
-        if profile_name:
-            return self._profiles.get(profile_name)
+        settings = self.__node_profile_settings.get(node, _NOT_CACHED)
+        if settings is _NOT_CACHED:
+            settings = None
+            profile_name = self.get_node_profile_name(node)
+            if profile_name:
+                settings = self._profiles.get(profile_name)
+            self.__node_profile_settings[node] = settings
+        return settings
 
     def __get_template(self, node, name):
         """
@@ -875,12 +1296,18 @@ class TankWriteNodeHandler(object):
             if template_name:
                 # update the cached setting:
                 self.__update_knob_value(node, name, template_name)
+            # the template for the profile has already been resolved:
+            return getattr(self.__resolved_profiles[settings["name"]], name)
         else:
             # the profile probably doesn't exist any more so
             # try to use the cached version
-            template_name = node.knob(name).value()
+            template_name = self.__get_knob(node, name).value()
 
-        return self._app.get_template_by_name(template_name)
+        template = self.__templates_by_name.get(template_name, _NOT_CACHED)
+        if template is _NOT_CACHED:
+            template = self._app.get_template_by_name(template_name)
+            self.__templates_by_name[template_name] = template
+        return template
 
     def __get_render_template(self, node, is_proxy=False, fallback_to_render=False):
         """
@@ -911,6 +1338,15 @@ class TankWriteNodeHandler(object):
         Determine if output key is used in either the render or the proxy render
         templates
         """
+        # the answer only depends on the profile's templates so if the node is using
+        # a known profile then it can be cached for that profile:
+        settings = self.__get_node_profile_settings(node)
+        if settings:
+            output_used = self.__profile_output_used.get(settings["name"])
+            if output_used is not None:
+                return output_used
+
+        output_used = False
         render_template = self.__get_render_template(node, is_proxy=False)
         proxy_render_template = self.__get_render_template(node, is_proxy=True)
 
@@ -919,9 +1355,12 @@ class TankWriteNodeHandler(object):
                 continue
             # check for output key and also channel for backwards compatibility!
             if "output" in template.keys or "channel" in template.keys:
-                return True
+                output_used = True
+                break
 
-        return False
+        if settings:
+            self.__profile_output_used[settings["name"]] = output_used
+        return output_used
 
     def __update_knob_value(self, node, name, new_value):
         """
@@ -929,26 +1368,56 @@ class TankWriteNodeHandler(object):
         but only if it is different to the current value to avoid
         unnecessarily invalidating the cache
         """
-        current_value = node.knob(name).value()
-        if new_value != current_value:
-            node.knob(name).setValue(new_value)
+        knob = self.__get_knob(node, name)
+        if new_value != knob.value():
+            knob.setValue(new_value)
+
+    def __get_knob(self, node, name):
+        """
+        Get the specified knob from the specified node.  Knobs are cached per node
+        so that the knobs used to update a node only have to be looked up once.
+
+        :param node:    The Flow Production Tracking Write node to get the knob from
+        :param name:    The name of the knob to get
+        :returns:       The knob or None if the node doesn't have the knob
+        """
+        node_knobs = self.__node_knobs.get(node)
+        if node_knobs is None:
+            node_knobs = self.__node_knobs[node] = {}
+
+        knob = node_knobs.get(name)
+        if knob is None:
+            knob = node.knob(name)
+            if knob is not None:
+                node_knobs[name] = knob
+        return knob
+
+    def __update_knob_visibility(self, knob, visible):
+        """
+        Show or hide the specified knob but only if its visibility is
+        changing to avoid unnecessarily refreshing the property editor
+        """
+        if knob.visible() != visible:
+            knob.setVisible(visible)
 
     def __update_output_knobs(self, node):
         """
         Update output knob visibility depending if output is a key
         in the render template or not
         """
-        output_knob = node.knob(TankWriteNodeHandler.OUTPUT_KNOB_NAME)
-        name_as_output_knob = node.knob(
-            TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME
+        output_knob = self.__get_knob(node, TankWriteNodeHandler.OUTPUT_KNOB_NAME)
+        name_as_output_knob = self.__get_knob(
+            node, TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME
         )
 
         output_is_used = self.__is_output_used(node)
         name_as_output = name_as_output_knob.value()
 
-        output_knob.setEnabled(output_is_used and not name_as_output)
-        output_knob.setVisible(output_is_used)
-        name_as_output_knob.setVisible(output_is_used)
+        output_enabled = output_is_used and not name_as_output
+        if output_knob.enabled() != output_enabled:
+            output_knob.setEnabled(output_enabled)
+        self.__update_knob_visibility(output_knob, output_is_used)
+        self.__update_knob_visibility(name_as_output_knob, output_is_used)
 
     def __update_path_preview(self, node, is_proxy):
         """
@@ -957,18 +1426,27 @@ class TankWriteNodeHandler(object):
         # first set up the node label
         # this will be displayed on the node in the graph
         # useful to tell what type of node it is
-        pn = node.knob("profile_name").value()
+        pn = self.get_node_profile_name(node)
         label = "PTR Write %s" % pn
-        self.__update_knob_value(node, "label", label)
 
         # get the render path:
         path = self.__get_render_path(node, is_proxy)
 
+        # nothing to do if the preview is already up to date for this node:
+        preview_state = (is_proxy, label, path, self._app.context)
+        if self.__applied_path_previews.get(node) == preview_state:
+            return
+
+        self.__update_knob_value(node, "label", label)
+
         # calculate the parts:
         context_path = local_path = file_name = ""
 
         # check to see if we have cached the various pieces for this node:
-        cache_key = (path, self._app.context)
+        if self._app.context is not self.__path_preview_context:
+            self.__path_preview_cache.clear()
+            self.__path_preview_context = self._app.context
+        cache_key = path
         cached_path_preview = self.__path_preview_cache.get(cache_key)
         if cached_path_preview:
             context_path = cached_path_preview["context_path"]
@@ -976,25 +1454,29 @@ class TankWriteNodeHandler(object):
             file_name = cached_path_preview["file_name"]
         else:
             # normalize the path for os platform
-            norm_path = path.replace(os.path.sep, "/")
+            norm_path = path
+            if _NEEDS_SLASH_FIX:
+                norm_path = path.replace(os.path.sep, "/")
 
-            # get the file name
-            file_name = os.path.basename(norm_path)
-            render_dir = os.path.dirname(norm_path)
+            # split into the directory and file name - as with os.path.dirname, trailing
+            # slashes are removed from the directory unless it's the root:
+            render_dir, sep, file_name = norm_path.rpartition("/")
+            render_dir = render_dir.rstrip("/") or sep
 
             # now get the context path
             context_path = None
-            for x in self._app.context.entity_locations:
+            for x in self.__get_entity_locations():
                 if render_dir.startswith(x):
                     context_path = x
+                    break
 
             if context_path:
                 # found a context path!
                 # chop off this bit from the normalized path
                 local_path = render_dir[len(context_path) :]
                 # drop start slash
-                if local_path.startswith(os.sep):
-                    local_path = local_path[len(os.sep) :]
+                if local_path.startswith("/"):
+                    local_path = local_path[1:]
                 # e.g. for path   /mnt/proj/shotXYZ/renders/v003/hello.%04d.exr
                 # context_path:   /mnt/proj/shotXYZ
                 # local_path:     renders/v003
@@ -1015,18 +1497,38 @@ class TankWriteNodeHandler(object):
         # update the preview knobs - note, not sure why but
         # under certain circumstances the property editor doesn't
         # update correctly - hiding and showing the knob seems to
-        # fix this though without any noticeable side effect
+        # fix this though without any noticeable side effect.  This
+        # is only needed when the value actually changes.
         def set_path_knob(name, value):
-            k = node.knob(name)
+            k = self.__get_knob(node, name)
             if k.value() != value:
                 k.setValue(value)
-            k.setVisible(False)
-            k.setVisible(True)
+                k.setVisible(False)
+                k.setVisible(True)
 
         set_path_knob("path_context", context_path)
         set_path_knob("path_local", local_path)
         set_path_knob("path_filename", file_name)
 
+        self.__applied_path_previews[node] = preview_state
+
+    def __get_entity_locations(self):
+        """
+        Get the locations on disk for the entities in the current context.  These are
+        looked up once per context as doing so may need to query the path cache.
+
+        :returns:   Tuple of the entity locations with forward slashes, sorted so that
+                    the longest location is first
+        """
+        context = self._app.context
+        if context is not self.__entity_locations_context:
+            locations = context.entity_locations
+            if _NEEDS_SLASH_FIX:
+                locations = [x.replace(os.path.sep, "/") for x in locations]
+            self.__entity_locations = tuple(sorted(locations, key=len, reverse=True))
+            self.__entity_locations_context = context
+        return self.__entity_locations
+
     def __apply_cached_file_format_settings(self, node):
         """
         Apply the file_type and settings that have been cached on the node to the internal
@@ -1043,12 +1545,15 @@ class TankWriteNodeHandler(object):
         file_settings = {}
         try:
             # file_settings_str is a pickled dictionary so convert it back to a dictionary:
-            file_settings = sgtk.util.pickle.loads(file_settings_str) or {}
+            if file_settings_str.startswith("{"):
+                # settings may have been cached as json by a previous version of the app:
+                file_settings = json.loads(file_settings_str) or {}
+            else:
+                file_settings = sgtk.util.pickle.loads(file_settings_str) or {}
         except Exception as e:
             self._app.log_warning(
                 "Failed to extract cached file settings from node '%s' - %s"
-                % node.name(),
-                e,
+                % (node.name(), e)
             )
 
         # update the node:
@@ -1085,34 +1590,48 @@ class TankWriteNodeHandler(object):
             self.__apply_cached_file_format_settings(node)
             return
 
+        # keep track of the old profile name:
+        old_profile_name = self.get_node_profile_name(node)
+
+        applied_profile, applied_context = self.__applied_profiles.get(
+            node, (None, None)
+        )
+        if (
+            not reset_all_settings
+            and profile_name == old_profile_name
+            and applied_profile is profile
+            and applied_context is self._app.context
+        ):
+            # this profile has already been applied to the node and neither the
+            # profile settings nor the context have changed since so there is
+            # nothing to do:
+            return
+
         self._app.log_debug(
             "Changing the profile for node '%s' to: %s" % (node.name(), profile_name)
         )
 
-        # keep track of the old profile name:
-        old_profile_name = node.knob("profile_name").value()
-
         # pull settings from profile:
-        render_template = self._app.get_template_by_name(profile["render_template"])
-        publish_template = self._app.get_template_by_name(profile["publish_template"])
-        proxy_render_template = self._app.get_template_by_name(
-            profile["proxy_render_template"]
-        )
-        proxy_publish_template = self._app.get_template_by_name(
-            profile["proxy_publish_template"]
-        )
+        resolved_profile = self.__resolved_profiles[profile_name]
+        render_template = resolved_profile.render_template
+        publish_template = resolved_profile.publish_template
+        proxy_render_template = resolved_profile.proxy_render_template
+        proxy_publish_template = resolved_profile.proxy_publish_template
         file_type = profile["file_type"]
         file_settings = profile["settings"]
         tile_color = profile["tile_color"]
         promote_write_knobs = profile.get("promote_write_knobs", [])
 
         # Make sure any invalid entries are removed from the profile list:
-        list_profiles = node.knob("tk_profile_list").values()
-        if list_profiles != self._profile_names:
-            node.knob("tk_profile_list").setValues(self._profile_names)
+        if self.__node_profile_lists.get(node) is not self._profile_names:
+            profile_list_knob = node.knob("tk_profile_list")
+            if tuple(profile_list_knob.values()) != self._profile_names:
+                profile_list_knob.setValues(list(self._profile_names))
+            self.__node_profile_lists[node] = self._profile_names
 
         # update both the list and the cached value for profile name:
         self.__update_knob_value(node, "profile_name", profile_name)
+        self.__forget_node_profile(node)
         self.__update_knob_value(node, "tk_profile_list", profile_name)
 
         # set the format
@@ -1128,7 +1647,7 @@ class TankWriteNodeHandler(object):
         # they get serialized with the script:
         self.__update_knob_value(node, "tk_file_type", file_type)
         self.__update_knob_value(
-            node, "tk_file_type_settings", sgtk.util.pickle.dumps(file_settings)
+            node, "tk_file_type_settings", resolved_profile.file_settings_str
         )
 
         # Hide the promoted knobs that might exist from the previously
@@ -1138,6 +1657,8 @@ class TankWriteNodeHandler(object):
 
         self._promoted_knobs[node] = []
         write_node = node.node(TankWriteNodeHandler.WRITE_NODE_NAME)
+        link_knob_names = TankWriteNodeHandler.PROMOTED_LINK_KNOB_NAMES
+        node_knobs = node.knobs() if promote_write_knobs else {}
 
         # We'll use link knobs to tie our top-level knob to the write node's
         # knob that we want to promote.
@@ -1149,7 +1670,10 @@ class TankWriteNodeHandler(object):
                 )
                 continue
 
-            link_name = "_promoted_" + str(i)
+            if i < len(link_knob_names):
+                link_name = link_knob_names[i]
+            else:
+                link_name = "_promoted_%d" % i
 
             # We have 20 link knobs stashed away to use.  If we overflow that
             # then we will simply create a new link knob and deal with the
@@ -1164,7 +1688,7 @@ class TankWriteNodeHandler(object):
                 # We have to pull the link knobs from the knobs dict rather than
                 # by name, otherwise we'll get the link target and not the link
                 # itself if this is a link that was previously used.
-                link_knob = node.knobs()[link_name]
+                link_knob = node_knobs[link_name]
 
             link_knob.setLink(target_knob.fullyQualifiedName())
             label = target_knob.label() or knob_name
@@ -1192,7 +1716,8 @@ class TankWriteNodeHandler(object):
         )
 
         # If a node's tile_color was defined in the profile then set it:
-        if not tile_color or len(tile_color) != 3:
+        packed_tile_color = resolved_profile.packed_tile_color
+        if packed_tile_color is None:
             if tile_color:
                 # don't have exactly three values for RGB so log a warning:
                 self._app.log_warning(
@@ -1207,13 +1732,7 @@ class TankWriteNodeHandler(object):
             default_value = int(node["tile_color"].defaultValue())
             self.__update_knob_value(node, "tile_color", default_value)
         else:
-            # build packed RGB
-            # (Red << 24) + (Green << 16) + (Blue << 8)
-            packed_rgb = 0
-            for element in tile_color:
-                packed_rgb = (packed_rgb + min(max(element, 0), 255)) << 8
-
-            self.__update_knob_value(node, "tile_color", packed_rgb)
+            self.__update_knob_value(node, "tile_color", packed_tile_color)
 
         # Reset the render path but only if the named profile has changed - this will only
         # be the case if the user has changed the profile through the UI so this will avoid
@@ -1221,6 +1740,8 @@ class TankWriteNodeHandler(object):
         if profile_name != old_profile_name:
             self.reset_render_path(node)
 
+        self.__applied_profiles[node] = (profile, self._app.context)
+
     def __populate_initial_output_name(self, template, node):
         """
         Create a suitable output name for a node based on it's profile and
@@ -1236,7 +1757,7 @@ class TankWriteNodeHandler(object):
         have_output_key = False
         output_default = None
         output_is_optional = True
-        for key_name in ["output", "channel"]:
+        for key_name in TankWriteNodeHandler.OUTPUT_KEY_NAMES:
             key = template.keys.get(key_name)
             if key:
                 have_output_key = True
@@ -1253,13 +1774,12 @@ class TankWriteNodeHandler(object):
             output_default = "output"
 
         # get the output names for all other nodes that are using the same profile
-        used_output_names = set()
         node_profile = self.get_node_profile_name(node)
-        for n in self.get_nodes():
-            if n != node and self.get_node_profile_name(n) == node_profile:
-                used_output_names.add(
-                    n.knob(TankWriteNodeHandler.OUTPUT_KNOB_NAME).value()
-                )
+        used_output_names = set(
+            n.knob(TankWriteNodeHandler.OUTPUT_KNOB_NAME).value()
+            for n in self.get_nodes()
+            if n != node and self.get_node_profile_name(n) == node_profile
+        )
 
         # handle if output is optional:
         if output_is_optional and "" not in used_output_names:
@@ -1315,27 +1835,26 @@ class TankWriteNodeHandler(object):
             return
 
         # get a list of the settings we shouldn't update:
-        knobs_to_skip = []
+        knobs_to_skip = set()
         if not reset_all_settings:
             # Skip setting any knobs on the internal Write node that are represented by knobs on the
             # containing Flow Production Tracking Write node.  These knobs are typically only set at
             # first creation time or when the profile is changed as the artist is then free to change
             # them.
-            for knob_name in node.knobs():
-                knob = node.knob(knob_name)
-
+            for knob_name, knob in node.knobs().items():
                 if knob.node() == write_node:
-                    knobs_to_skip.append(knob_name)
+                    knobs_to_skip.add(knob_name)
 
-            knobs_to_skip.extend(promoted_write_knobs)
+            knobs_to_skip.update(promoted_write_knobs)
 
         # now apply file format settings
+        get_write_node_knob = write_node.knob
         for setting_name, setting_value in file_settings.items():
             if setting_name in knobs_to_skip:
                 # skip this setting:
                 continue
 
-            knob = write_node.knob(setting_name)
+            knob = get_write_node_knob(setting_name)
             if knob is None:
                 self._app.log_error(
                     "%s is not a valid setting for file format %s. It will be ignored."
@@ -1344,10 +1863,13 @@ class TankWriteNodeHandler(object):
                 continue
 
             knob.setValue(setting_value)
-            if knob.value() != setting_value:
+            # Nuke may not accept the value as-is (e.g. an unknown enumeration
+            # value) so check what it was actually set to:
+            actual_value = knob.value()
+            if actual_value != setting_value:
                 self._app.log_error(
                     "Could not set %s file format setting %s to '%s'. Instead the value was set to '%s'"
-                    % (file_type, setting_name, setting_value, knob.value())
+                    % (file_type, setting_name, setting_value, actual_value)
                 )
 
         # If we're not resetting everything, then we need to try and
@@ -1365,40 +1887,46 @@ class TankWriteNodeHandler(object):
             tcl_settings = node.knob("tk_write_node_settings").value()
 
             if tcl_settings:
-                decoded_settings = base64.b64decode(tcl_settings)
-                knob_settings = pickle.loads(decoded_settings)
                 # We're going to filter out everything that isn't one of our
                 # promoted write node knobs. This will allow us to make sure
                 # that those knobs are set to the correct value, regardless
                 # of what the profile settings above have done.
                 filtered_settings = []
-
-                # Example data after splitting:
-                #
-                # ['',
-                #  'file /some/path/to/an/image.exr',
-                #  'proxy /some/path/to/an/image.exr',
-                #  'file_type exr',
-                #  'datatype "32 bit float"',
-                #  'beforeRender "<beforeRender callback script>"',
-                #  'afterRender "<afterRender callback script>"']
-                for setting in re.split(r"\n", knob_settings):
-                    # We match the name of the knob, which is everything up to
-                    # the first space character. From the example data above,
-                    # that would be something like "datatype".
-                    match = re.match(r"(\S+)\s.*", setting)
-                    if match:
-                        if match.group(1) in promoted_write_knobs:
+                if promoted_write_knobs:
+                    decoded_settings = base64.b64decode(tcl_settings)
+                    knob_settings = pickle.loads(decoded_settings)
+                    promoted_write_knob_names = set(promoted_write_knobs)
+
+                    # Example data after splitting:
+                    #
+                    # ['',
+                    #  'file /some/path/to/an/image.exr',
+                    #  'proxy /some/path/to/an/image.exr',
+                    #  'file_type exr',
+                    #  'datatype "32 bit float"',
+                    #  'beforeRender "<beforeRender callback script>"',
+                    #  'afterRender "<afterRender callback script>"']
+                    for setting in knob_settings.split("\n"):
+                        # We match the name of the knob, which is everything up to
+                        # the first space character. From the example data above,
+                        # that would be something like "datatype".
+                        knob_name, sep, _ = setting.partition(" ")
+                        if sep and knob_name in promoted_write_knob_names:
                             self._app.log_debug(
                                 "Found promoted write node knob setting: %s" % setting
                             )
                             filtered_settings.append(setting)
 
-                self._app.log_debug(
-                    "Promoted write node knob settings to be applied: %s"
-                    % filtered_settings
-                )
-                write_node.readKnobs("\n".join(filtered_settings))
+                if filtered_settings:
+                    self._app.log_debug(
+                        "Promoted write node knob settings to be applied: %s"
+                        % filtered_settings
+                    )
+                    write_node.readKnobs("\n".join(filtered_settings))
+
+                # the render path is reset whenever settings were stored on the node,
+                # even if none of them needed applying, as setting up a node when a
+                # script is loaded or the context changes relies on this:
                 self.reset_render_path(node)
 
     def __set_output(self, node, output_name):
@@ -1422,42 +1950,41 @@ class TankWriteNodeHandler(object):
         Wrap text to the line_length number of characters where possible
         splitting on words
         """
-        lines = []
-        this_line = ""
-        for part in t.split(" "):
-            if len(part) >= line_length:
-                if this_line:
-                    lines.append(this_line)
-                    this_line = ""
-                lines.append(part)
-                this_line_len = 0
-            else:
-                this_line = " ".join([this_line, part]) if this_line else part
-                if len(this_line) >= line_length:
-                    lines.append(this_line)
-                    this_line = ""
-        if this_line:
-            lines.append(this_line)
+        # the same error text gets wrapped every time a path is updated:
+        cache_key = (t, line_length)
+        lines = self.__wrapped_text_cache.get(cache_key)
+        if lines is not None:
+            return list(lines)
+
+        lines = _wrap_text(t, line_length)
+        self.__wrapped_text_cache[cache_key] = tuple(lines)
         return lines
 
-    def __update_render_path(self, node, force_reset=False, is_proxy=False):
+    def __update_render_path(
+        self, node, force_reset=False, is_proxy=False, reuse_other_path=False
+    ):
         """
         Update the render path and the various feedback knobs based on the current
         context and other node settings.
 
-        :param node:        The Flow Production Tracking Write node to update the path for
-        :param force_reset: Force the path to be reset regardless of any cached
-                            values
-        :param is_proxy:    If True then update the proxy render path, otherwise
-                            just update the normal render path.
-        :returns:           The updated render path
-        """
+        :param node:                The Flow Production Tracking Write node to update the
+                                    path for
+        :param force_reset:         Force the path to be reset regardless of any cached
+                                    values
+        :param is_proxy:            If True then update the proxy render path, otherwise
+                                    just update the normal render path.
+        :param reuse_other_path:    If True then the path last computed for the other
+                                    render mode will be used if it was computed from the
+                                    same settings
+        :returns:                   The updated render path
+        """
+        updating_flag = _UPDATING_PROXY_PATH if is_proxy else _UPDATING_RENDER_PATH
         try:
             # get the cached path without evaluating:
             cached_path = (
-                node.knob("tk_cached_proxy_path").toScript()
+                self.__get_knob(node, "tk_cached_proxy_path").toScript()
                 if is_proxy
-                else node.knob("cached_path").toScript()
+                else self.__get_knob(node, "cached_path").toScript()
             )
 
             if node in self.__currently_rendering_nodes:
@@ -1471,16 +1998,9 @@ class TankWriteNodeHandler(object):
             # and proxy paths to be re-evaluated causing this function to be called recursively which
             # can break things!  In case that happens we use some flags to track it so that the path
             # only gets updated once.
-            if is_proxy:
-                if self.__is_updating_proxy_path:
-                    return cached_path
-                else:
-                    self.__is_updating_proxy_path = True
-            else:
-                if self.__is_updating_render_path:
-                    return cached_path
-                else:
-                    self.__is_updating_render_path = True
+            if self.__updating_paths & updating_flag:
+                return cached_path
+            self.__updating_paths |= updating_flag
 
             # get the current script path:
             script_path = self.__get_current_script_path()
@@ -1504,6 +2024,7 @@ class TankWriteNodeHandler(object):
                 )
                 old_cache_entry, compute_path_error, render_path = cache_item
                 cache_entry = {
+                    "template": render_template,
                     "ctx": self._app.context,
                     "width": width,
                     "height": height,
@@ -1521,10 +2042,29 @@ class TankWriteNodeHandler(object):
                     if compute_path_error:
                         raise TkComputePathError(compute_path_error)
                 else:
-                    # compute the render path:
-                    render_path = self.__compute_render_path_from(
-                        node, render_template, width, height, output_name
-                    )
+                    render_path = None
+                    if reuse_other_path:
+                        (
+                            other_cache_entry,
+                            other_error,
+                            other_render_path,
+                        ) = self.__node_computed_path_settings_cache.get(
+                            (node, not is_proxy), (None, "", "")
+                        )
+                        if other_cache_entry == cache_entry and not other_error:
+                            render_path = other_render_path
+
+                    if render_path is None:
+                        # compute the render path:
+                        render_path = self.__compute_render_path_from(
+                            node,
+                            render_template,
+                            width,
+                            height,
+                            output_name,
+                            script_path,
+                            force_reset=force_reset,
+                        )
 
             except TkComputePathError as e:
                 # update cache:
@@ -1536,16 +2076,7 @@ class TankWriteNodeHandler(object):
 
                 # render path could not be computed for some reason - display warning
                 # to the user in the property editor:
-                path_warning += (
-                    "<br>".join(
-                        self.__wrap_text(
-                            "The render path is currently frozen because Toolkit could not "
-                            "determine a valid path!  This was due to the following problem:",
-                            60,
-                        )
-                    )
-                    + "<br>"
-                )
+                path_warning += TankWriteNodeHandler.FROZEN_PATH_WARNING_HTML + "<br>"
                 path_warning += "<br>"
                 path_warning += (
                     "&nbsp;&nbsp;&nbsp;"
@@ -1556,13 +2087,7 @@ class TankWriteNodeHandler(object):
                 if cached_path:
                     # have a previously cached path so we can at least still render:
                     path_warning += "<br>"
-                    path_warning += "<br>".join(
-                        self.__wrap_text(
-                            "You can still render to the frozen path but you won't be able to "
-                            "publish this node!",
-                            60,
-                        )
-                    )
+                    path_warning += TankWriteNodeHandler.FROZEN_PATH_RENDER_HINT_HTML
 
                 render_path = cached_path
             else:
@@ -1585,23 +2110,10 @@ class TankWriteNodeHandler(object):
                 if path_is_locked:
                     # render path was not what we expected!
                     path_warning += (
-                        "<br>".join(
-                            self.__wrap_text(
-                                "The path does not match the current PTR Work Area.  You can "
-                                "still render but you will not be able to publish this node.",
-                                60,
-                            )
-                        )
-                        + "<br>"
+                        TankWriteNodeHandler.LOCKED_PATH_WARNING_HTML + "<br>"
                     )
                     path_warning += "<br>"
-                    path_warning += "<br>".join(
-                        self.__wrap_text(
-                            "The path will be automatically reset next time you version-up, publish "
-                            "or click 'Reset Path'.",
-                            60,
-                        )
-                    )
+                    path_warning += TankWriteNodeHandler.LOCKED_PATH_RESET_HINT_HTML
 
                     reset_path_button_visible = True
                     render_path = cached_path
@@ -1616,7 +2128,7 @@ class TankWriteNodeHandler(object):
                 # Also update the 'last known script' to be the current script
                 # this mechanism is used to determine if the script is being saved
                 # as a new file or as the same file in the onScriptSave callback
-                last_known_script_knob = node.knob("tk_last_known_script")
+                last_known_script_knob = self.__get_knob(node, "tk_last_known_script")
                 if force_reset or not last_known_script_knob.value():
                     last_known_script_knob.setValue(script_path)
 
@@ -1624,44 +2136,32 @@ class TankWriteNodeHandler(object):
             # isn't in proxy mode!  Because we only want to update the UI to represent the 'actual'
             # state then we check for that here:
             if is_proxy == node.proxy():
-                # update warning displayed to the user:
-                if path_warning:
-                    path_warning = (
-                        "<i style='color:orange'><b><br>Warning</b><br>%s</i><br>"
-                        % path_warning
-                    )
-                    self.__update_knob_value(node, "path_warning", path_warning)
-                    node.knob("path_warning").setVisible(True)
-                else:
-                    self.__update_knob_value(node, "path_warning", "")
-                    node.knob("path_warning").setVisible(False)
-                node.knob("reset_path").setVisible(reset_path_button_visible)
-
-                # show/hide proxy mode label depending if we're currently
-                # rendering in proxy mode:
-                node.knob("tk_render_mode").setVisible(is_proxy)
-
                 # update the render warning label if needed:
                 render_warning = ""
                 if is_proxy:
                     full_render_path = self.__get_render_path(node, False)
                     if full_render_path == render_path:
                         render_warning = (
-                            "The full & proxy resolution render paths are currently the same.  "
-                            "Rendering in proxy mode will overwrite any previously rendered "
-                            "full-res frames!"
+                            TankWriteNodeHandler.PROXY_OVERWRITE_WARNING_HTML
                         )
-                if render_warning:
-                    self.__update_knob_value(
+
+                # the warnings only need updating if they have changed since they
+                # were last displayed on this node:
+                warning_state = (
+                    is_proxy,
+                    path_warning,
+                    reset_path_button_visible,
+                    render_warning,
+                )
+                if self.__applied_path_warnings.get(node) != warning_state:
+                    self.__update_path_warnings(
                         node,
-                        "tk_render_warning",
-                        "<i style='color:orange'><b>Warning</b> <br>%s<i><br>"
-                        % "<br>".join(self.__wrap_text(render_warning, 60)),
+                        is_proxy,
+                        path_warning,
+                        reset_path_button_visible,
+                        render_warning,
                     )
-                    node.knob("tk_render_warning").setVisible(True)
-                else:
-                    self.__update_knob_value(node, "tk_render_warning", "")
-                    node.knob("tk_render_warning").setVisible(False)
+                    self.__applied_path_warnings[node] = warning_state
 
                 # update output knobs:
                 self.__update_output_knobs(node)
@@ -1673,10 +2173,50 @@ class TankWriteNodeHandler(object):
 
         finally:
             # make sure we reset the update flag
-            if is_proxy:
-                self.__is_updating_proxy_path = False
-            else:
-                self.__is_updating_render_path = False
+            self.__updating_paths &= ~updating_flag
+
+    def __update_path_warnings(
+        self, node, is_proxy, path_warning, reset_path_button_visible, render_warning
+    ):
+        """
+        Update the warnings displayed in the property editor for the specified node
+
+        :param node:                        The Flow Production Tracking Write node to update
+        :param is_proxy:                    True if the node is in proxy mode
+        :param path_warning:                The render path warning to display, if any
+        :param reset_path_button_visible:   True if the 'Reset Path' button should be shown
+        :param render_warning:              The render warning HTML to display, if any
+        """
+        # update warning displayed to the user:
+        if path_warning:
+            path_warning = (
+                "<i style='color:orange'><b><br>Warning</b><br>%s</i><br>"
+                % path_warning
+            )
+            self.__update_knob_value(node, "path_warning", path_warning)
+            self.__update_knob_visibility(self.__get_knob(node, "path_warning"), True)
+        else:
+            self.__update_knob_value(node, "path_warning", "")
+            self.__update_knob_visibility(self.__get_knob(node, "path_warning"), False)
+        self.__update_knob_visibility(
+            self.__get_knob(node, "reset_path"), reset_path_button_visible
+        )
+
+        # show/hide proxy mode label depending if we're currently
+        # rendering in proxy mode:
+        self.__update_knob_visibility(self.__get_knob(node, "tk_render_mode"), is_proxy)
+
+        # update the render warning label:
+        if render_warning:
+            self.__update_knob_value(node, "tk_render_warning", render_warning)
+            self.__update_knob_visibility(
+                self.__get_knob(node, "tk_render_warning"), True
+            )
+        else:
+            self.__update_knob_value(node, "tk_render_warning", "")
+            self.__update_knob_visibility(
+                self.__get_knob(node, "tk_render_warning"), False
+            )
 
     def __get_render_path(self, node, is_proxy=False):
         """
@@ -1687,9 +2227,9 @@ class TankWriteNodeHandler(object):
 
         # get the cached path to return:
         if is_proxy:
-            path = node.knob("tk_cached_proxy_path").toScript()
+            path = self.__get_knob(node, "tk_cached_proxy_path").toScript()
         else:
-            path = node.knob("cached_path").toScript()
+            path = self.__get_knob(node, "cached_path").toScript()
 
         if not path:
             # never been cached so compute instead:
@@ -1709,15 +2249,14 @@ class TankWriteNodeHandler(object):
         file_name = self.__get_render_path(node, is_proxy)
         template = self.__get_render_template(node, is_proxy, fallback_to_render=True)
 
-        if not template.validate(file_name):
+        fields = self.__get_template_fields(template, file_name)
+        if fields is None:
             raise Exception(
                 "Could not resolve the files on disk for node %s."
                 "The path '%s' is not recognized by Flow Production Tracking!"
                 % (node.name(), file_name)
             )
 
-        fields = template.get_fields(file_name)
-
         # make sure we don't look for any eye - %V or SEQ - %04d stuff
         frames = self._app.sgtk.paths_from_template(template, fields, ["SEQ", "eye"])
 
@@ -1831,7 +2370,14 @@ class TankWriteNodeHandler(object):
         )
 
     def __compute_render_path_from(
-        self, node, render_template, width, height, output_name
+        self,
+        node,
+        render_template,
+        width,
+        height,
+        output_name,
+        script_path=None,
+        force_reset=False,
     ):
         """
         Computes the render path for a node using the specified settings
@@ -1841,6 +2387,9 @@ class TankWriteNodeHandler(object):
         :param width:              The width of the rendered images
         :param height:             The height of the rendered images
         :param output_name:        The toolkit output name specified by the user for this node
+        :param script_path:        The current script path if the caller already has it
+        :param force_reset:        If True then always compute the path rather than using
+                                   a path previously computed from the same settings
         :returns:                  The computed render path
         """
 
@@ -1849,42 +2398,48 @@ class TankWriteNodeHandler(object):
             raise TkComputePathError("Unable to determine the render template to use!")
 
         # get the current script path:
-        curr_filename = self.__get_current_script_path()
+        curr_filename = script_path or self.__get_current_script_path()
+
+        # the path may have recently been computed from the same settings, e.g. when
+        # toggling between proxy and full-res or when checking if the path is locked:
+        if self._app.context is not self.__computed_render_paths_context:
+            self.__computed_render_paths.clear()
+            self.__context_fields.clear()
+            self.__computed_render_paths_context = self._app.context
+        today = datetime.date.today()
+        computed_path_key = (
+            render_template.name,
+            render_template.definition,
+            width,
+            height,
+            output_name,
+            curr_filename,
+            today,
+        )
+        if not force_reset:
+            path = self.__computed_render_paths.get(computed_path_key)
+            if path is not None:
+                return path
 
         # create fields dict with all the metadata
         #
 
         # extract the work fields from the script path using the work_file template:
-        fields = {}
-        if (
-            curr_filename
-            and self._script_template
-            and self._script_template.validate(curr_filename)
-        ):
-            fields = self._script_template.get_fields(curr_filename)
+        fields = self.__get_script_fields(curr_filename)
         if not fields:
             raise TkComputePathError("The current script is not a PTR Work File!")
 
-        # Force use of %d format for nuke renders:
-        fields["SEQ"] = "FORMAT: %d"
-
-        # use %V - full view printout as default for the eye field
-        fields["eye"] = "%V"
-
-        # add in width & height:
+        # add in the fixed fields, width & height and date values for YYYY, MM, DD:
+        fields.update(TankWriteNodeHandler.RENDER_PATH_FIXED_FIELDS)
         fields["width"] = width
         fields["height"] = height
-
-        # add in date values for YYYY, MM, DD
-        today = datetime.date.today()
         fields["YYYY"] = today.year
         fields["MM"] = today.month
         fields["DD"] = today.day
 
         # validate the output name - be backwards compatible with 'channel' as well
-        for key_name in ["output", "channel"]:
-            if key_name in fields:
-                del fields[key_name]
+        for key_name in TankWriteNodeHandler.OUTPUT_KEY_NAMES:
+            fields.pop(key_name, None)
 
             if key_name in render_template.keys:
                 if not output_name:
@@ -1902,20 +2457,78 @@ class TankWriteNodeHandler(object):
                     fields[key_name] = output_name
 
         # update with additional fields from the context:
-        fields.update(self._app.context.as_template_fields(render_template))
+        # (these are only cached once a path has been successfully generated from them
+        # as they depend on the path cache & folders that may not have been created yet)
+        context_fields_key = (render_template.name, render_template.definition)
+        context_fields = None
+        if not force_reset:
+            context_fields = self.__context_fields.get(context_fields_key)
+        if context_fields is None:
+            context_fields = self._app.context.as_template_fields(render_template)
+        fields.update(context_fields)
 
         # generate the render path:
         path = ""
         try:
             path = render_template.apply_fields(fields)
         except TankError as e:
+            self.__context_fields.pop(context_fields_key, None)
             raise TkComputePathError(str(e))
+        self.__context_fields[context_fields_key] = context_fields
 
         # make slahes uniform:
-        path = path.replace(os.path.sep, "/")
+        if _NEEDS_SLASH_FIX:
+            path = path.replace(os.path.sep, "/")
 
+        self.__computed_render_paths[computed_path_key] = path
         return path
 
+    def __get_script_fields(self, script_path):
+        """
+        Extract the work fields from the specified script path using the work file
+        template.  The fields for the last script path are cached as the script
+        rarely changes between path updates.
+
+        :param script_path: The script path to extract the fields from
+        :returns:           A new dictionary of the fields extracted from the script
+                            path.  This will be empty if the path isn't a work file.
+        """
+        script_template, cached_path, fields = self.__script_fields_cache
+        if script_template is not self._script_template or cached_path != script_path:
+            fields = {}
+            if (
+                script_path
+                and self._script_template
+                and self._script_template.validate(script_path)
+            ):
+                fields = self._script_template.get_fields(script_path)
+            self.__script_fields_cache = (self._script_template, script_path, fields)
+
+        # return a copy as the caller will add to the fields:
+        return dict(fields)
+
+    def __get_template_fields(self, template, path):
+        """
+        Extract the fields from the specified path using the specified template.  The
+        same paths are typically checked several times as a node is updated so the
+        results are cached.
+
+        :param template:    The template to extract the fields with
+        :param path:        The path to extract the fields from
+        :returns:           A new dictionary of the fields extracted from the path or None
+                            if the path doesn't match the template
+        """
+        cache_key = (template.name, template.definition, path)
+        fields = self.__template_fields_cache.get(cache_key, _NOT_CACHED)
+        if fields is _NOT_CACHED:
+            try:
+                fields = template.get_fields(path)
+            except TankError:
+                fields = None
+            self.__template_fields_cache[cache_key] = fields
+
+        return dict(fields) if fields is not None else None
+
     def __is_render_path_locked(self, node, render_path, cached_path, is_proxy=False):
         """
         Return True if the render path is currently locked because something unexpected
@@ -1932,38 +2545,45 @@ class TankWriteNodeHandler(object):
         if not render_template:
             return True
 
-        path_is_locked = False
-        if cached_path:
-            # Need to determine if something unexpected has changed in the file path that
-            # we care about. To do this, we need to:
-            # - Extract previous fields from cached path - if this fails then it tells us
-            #   that a static part of the template has changed
-            # - Compare previous fields with new fields - this will tell us if a field we
-            #   care about has changed (we can ignore width, height differences).
-            prev_fields = {}
-            try:
-                prev_fields = render_template.get_fields(cached_path)
-            except TankError:
-                # failed to extract or apply fields so something changed!
-                path_is_locked = True
-            else:
-                # get the new fields from the render path and compare:
-                new_fields = render_template.get_fields(render_path)
-
-                path_is_locked = len(new_fields) != len(prev_fields)
-                if not path_is_locked:
-                    for name, value in new_fields.items():
-                        if name not in prev_fields:
-                            path_is_locked = True
-                            break
-
-                        if name in ["width", "height", "YYYY", "MM", "DD"]:
-                            # ignore these as they are free to change!
-                            continue
-                        elif prev_fields[name] != value:
-                            path_is_locked = True
-                            break
+        if not cached_path or render_path == cached_path:
+            # nothing to compare against or nothing has changed!
+            return False
 
+        # the result only depends on the template and the two paths so if these
+        # haven't changed since the last check then there is nothing to do:
+        lock_inputs = (render_template, render_path, cached_path)
+        last_inputs, last_result = self.__path_lock_results.get(
+            (node, is_proxy), (None, None)
+        )
+        if last_inputs == lock_inputs:
+            return last_result
+
+        # Need to determine if something unexpected has changed in the file path that
+        # we care about. To do this, we need to:
+        # - Extract previous fields from cached path - if this fails then it tells us
+        #   that a static part of the template has changed
+        # - Compare previous fields with new fields - this will tell us if a field we
+        #   care about has changed (we can ignore width, height differences).
+        prev_fields = self.__get_template_fields(render_template, cached_path)
+        new_fields = None
+        if prev_fields is not None:
+            # get the new fields from the render path and compare:
+            new_fields = self.__get_template_fields(render_template, render_path)
+
+        if prev_fields is None or new_fields is None:
+            # failed to extract fields so something changed!
+            path_is_locked = True
+        else:
+            new_names = new_fields.keys()
+            path_is_locked = new_names != prev_fields.keys()
+            if not path_is_locked:
+                # ignore the fields that are free to change!
+                for name in new_names - TankWriteNodeHandler.PATH_LOCK_IGNORED_FIELDS:
+                    if prev_fields[name] != new_fields[name]:
+                        path_is_locked = True
+                        break
+
+        self.__path_lock_results[(node, is_proxy)] = (lock_inputs, path_is_locked)
         return path_is_locked
 
     def setup_new_node(self, node):
@@ -1990,6 +2610,14 @@ class TankWriteNodeHandler(object):
 
         self._app.log_debug("Setting up new node...")
 
+        # make sure the path preview and warnings get fully updated for this node:
+        self.__applied_path_previews.pop(node, None)
+        self.__applied_path_warnings.pop(node, None)
+
+        # this node may have been pasted/loaded from a different script so make
+        # sure the next save checks all nodes for a new script path:
+        self.__last_save_path = None
+
         # reset the construction flag to ensure that
         # the node is toggled into its incomplete state
         # this will disable certain callbacks from firing.
@@ -1997,22 +2625,29 @@ class TankWriteNodeHandler(object):
 
         # populate the profiles list as this isn't stored with the file and is
         # dynamic based on the user's configuration
-        profile_names = list(self._profile_names)
+        profile_names = self._profile_names
         current_profile_name = self.get_node_profile_name(node)
         if current_profile_name and current_profile_name not in self._profiles:
             # profile no longer exists but we need to handle this so add it
             # to the list:
-            current_profile_name = "%s [Not Found]" % current_profile_name
-            profile_names.insert(0, current_profile_name)
-
-        list_profiles = node.knob("tk_profile_list").values()
-        if list_profiles != profile_names:
-            node.knob("tk_profile_list").setValues(profile_names)
+            current_profile_name = current_profile_name + _PROFILE_NOT_FOUND_SUFFIX
+            profile_names = (current_profile_name,) + profile_names
+
+        profile_list_knob = node.knob("tk_profile_list")
+        if self.__node_profile_lists.get(node) is not profile_names:
+            # the list may not have been set to the current profiles yet:
+            if tuple(profile_list_knob.values()) != profile_names:
+                profile_list_knob.setValues(list(profile_names))
+            if profile_names is self._profile_names:
+                # the list only contains the current profiles:
+                self.__node_profile_lists[node] = self._profile_names
+            else:
+                self.__node_profile_lists.pop(node, None)
 
         reset_all_profile_settings = False
         if not current_profile_name:
             # default to first profile:
-            current_profile_name = node.knob("tk_profile_list").value()
+            current_profile_name = profile_list_knob.value()
             # and as this node has never had a profile set, lets make
             # sure we reset all settings
             reset_all_profile_settings = True
@@ -2024,9 +2659,13 @@ class TankWriteNodeHandler(object):
             node, current_profile_name, reset_all_settings=reset_all_profile_settings
         )
 
-        # ensure that the disable value properly propogates to the internal write node:
+        # ensure that the disable value properly propogates to the internal write node
+        # (but only if it's different to avoid an unnecessary knobChanged):
         write_node = node.node(TankWriteNodeHandler.WRITE_NODE_NAME)
-        write_node["disable"].setValue(node["disable"].value())
+        disable = node["disable"].value()
+        write_node_disable_knob = write_node["disable"]
+        if write_node_disable_knob.value() != disable:
+            write_node_disable_knob.setValue(disable)
 
         # Ensure that the output name matches the node name if
         # that option is enabled on the node. This is primarily
@@ -2065,10 +2704,11 @@ class TankWriteNodeHandler(object):
         mechanism allows the code to ignore other callbacks that may fail because things aren't set
         up correctly (e.g. knobChanged calls for default values when loading a script).
         """
-        if not node.knob("tk_is_fully_constructed"):
+        knob = self.__get_knob(node, "tk_is_fully_constructed")
+        if not knob:
             return False
 
-        return node.knob("tk_is_fully_constructed").value()
+        return knob.value()
 
     def __on_knob_changed(self):
         """
@@ -2078,10 +2718,20 @@ class TankWriteNodeHandler(object):
         Note, this gets called numerous times when a script is loaded as well as when
         a knob is changed via the user/script
         """
-        node = nuke.thisNode()
         knob = nuke.thisKnob()
-        grp = nuke.thisGroup()
+        knob_name = knob.name()
+        if knob_name == "profile_name":
+            # make sure the cached profile name gets refreshed:
+            self.__forget_node_profile(nuke.thisNode())
+            return
 
+        handler = self.__knob_changed_handlers.get(knob_name)
+        if not handler:
+            # Nuke calls this for every knob on the node but we only care about a
+            # few of them so bail out before doing anything more expensive!
+            return
+
+        node = nuke.thisNode()
         if not self.__is_node_fully_constructed(node):
             # knobChanged will be called during script load for all knobs with non-default
             # values.  We want to ignore these implicit changes so we make use of a knob to
@@ -2090,62 +2740,101 @@ class TankWriteNodeHandler(object):
             # print "Ignoring change to %s.%s value = %s" % (node.name(), knob.name(), knob.value())
             return
 
-        if knob.name() == "tk_profile_list":
-            # change the profile for the specified node:
-            new_profile_name = knob.value()
-            self.__set_profile(node, new_profile_name, reset_all_settings=True)
-
-        elif knob.name() == TankWriteNodeHandler.OUTPUT_KNOB_NAME:
-            # internal cached output has been changed!
-            new_output_name = knob.value()
-            if node.knob(TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME).value():
-                # force output name to be the node name:
-                new_output_name = node.knob("name").value()
-            self.__set_output(node, new_output_name)
+        handler(node, knob)
 
-        elif knob.name() == "name":
-            # node name has changed:
-            if node.knob(TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME).value():
-                # set the output to the node name:
-                self.__set_output(node, knob.value())
-
-        elif knob.name() == TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME:
-            # checkbox controlling if the name should be used as the output has been toggled
-            name_as_output = knob.value()
-            node.knob(TankWriteNodeHandler.OUTPUT_KNOB_NAME).setEnabled(
-                not name_as_output
-            )
-            if name_as_output:
-                # update output to reflect the node name:
-                self.__set_output(node, node.knob("name").value())
+    def __on_profile_list_changed(self, node, knob):
+        """
+        Called when the profile list knob on a Flow Production Tracking Write node
+        has been changed.
+        """
+        # change the profile for the specified node:
+        new_profile_name = knob.value()
+        self.__set_profile(node, new_profile_name, reset_all_settings=True)
 
-        else:
-            # Propagate changes to certain knobs from the gizmo/group to the
-            # encapsulated Write node.
-            #
-            # The normal mechanism of linking these knobs can't be used because the
-            # knob already exists as part of the base node (it's not added by the gizmo)
-            knobs_to_propogate = ["disable"]
-
-            # check if the value for this knob should be propogated:
-            knob_name = knob.name()
-            if knob_name in knobs_to_propogate:
-                # find the enclosed write node:
-                write_node = grp.node(TankWriteNodeHandler.WRITE_NODE_NAME)
-                if not write_node:
-                    return
-
-                # propogate the value:
-                self._app.log_debug(
-                    "Propogating value for '%s.%s' to '%s.%s.%s'"
-                    % (grp.name(), knob_name, grp.name(), write_node.name(), knob_name)
+    def __on_output_changed(self, node, knob):
+        """
+        Called when the output knob on a Flow Production Tracking Write node has
+        been changed.
+        """
+        # internal cached output has been changed!
+        new_output_name = knob.value()
+        if node.knob(TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME).value():
+            # force output name to be the node name:
+            new_output_name = node.knob("name").value()
+        self.__set_output(node, new_output_name)
+
+    def __on_name_changed(self, node, knob):
+        """
+        Called when a Flow Production Tracking Write node has been renamed.
+        """
+        # node name has changed:
+        if node.knob(TankWriteNodeHandler.USE_NAME_AS_OUTPUT_KNOB_NAME).value():
+            # set the output to the node name:
+            self.__set_output(node, knob.value())
+
+    def __on_use_name_as_output_changed(self, node, knob):
+        """
+        Called when the checkbox controlling if the name should be used as the
+        output has been toggled.
+        """
+        name_as_output = knob.value()
+        node.knob(TankWriteNodeHandler.OUTPUT_KNOB_NAME).setEnabled(not name_as_output)
+        if name_as_output:
+            # update output to reflect the node name:
+            self.__set_output(node, node.knob("name").value())
+
+    def __on_propagated_knob_changed(self, node, knob):
+        """
+        Propagate changes to certain knobs from the gizmo/group to the
+        encapsulated Write node.
+
+        The normal mechanism of linking these knobs can't be used because the
+        knob already exists as part of the base node (it's not added by the gizmo)
+        """
+        knob_name = knob.name()
+
+        # find the enclosed write node:
+        grp = nuke.thisGroup()
+        write_node = grp.node(TankWriteNodeHandler.WRITE_NODE_NAME)
+        if not write_node:
+            return
+
+        # propogate the value - only build the debug message if it will
+        # actually be logged as this can get called a lot on script load:
+        if self._app.logger.isEnabledFor(logging.DEBUG):
+            self._app.log_debug(
+                "Propogating value for '%s.%s' to '%s.%s.%s'"
+                % (
+                    grp.name(),
+                    knob_name,
+                    grp.name(),
+                    write_node.name(),
+                    knob_name,
                 )
+            )
 
-                write_node.knob(knob_name).setValue(nuke.thisKnob().value())
+        write_node.knob(knob_name).setValue(knob.value())
 
     def __get_current_script_path(self):
         """
-        Get the current script path (if the current script has been saved).  This will
+        Get the current script path (if the current script has been saved).  Once
+        callbacks have been added, the path is cached until the script is saved,
+        loaded or closed.
+
+        :returns:   The current Nuke script path or None if the script hasn't been
+                    saved yet.  The path will have os-correct slashes
+        """
+        if self.__script_path_cache is not _NOT_CACHED:
+            return self.__script_path_cache
+
+        script_path = self.__read_current_script_path()
+        if self.__is_tracking_nodes:
+            self.__script_path_cache = script_path
+        return script_path
+
+    def __read_current_script_path(self):
+        """
+        Read the current script path from Nuke (if the current script has been saved).  This will
         use the nuke.scriptName() call if available (Nuke 8+ ?) otherwise it will fall
         back to the slightly less safe nuke.root().name() - this will result in an
         internal error (not a catchable exception) if the root object doesn't yet exist
@@ -2170,7 +2859,7 @@ class TankWriteNodeHandler(object):
                 if script_path == "Root":
                     script_path = None
 
-        if script_path:
+        if script_path and _NEEDS_SLASH_FIX:
             # convert to os-style slashes:
             script_path = script_path.replace(os.path.sep, "/")
 
@@ -2183,29 +2872,43 @@ class TankWriteNodeHandler(object):
         Iterates over the Shotgun write nodes in the scene.  If the script is being saved as
         a new file then it resets all render paths before saving
         """
+        # the script may have been saved with a new name:
+        self.__script_path_cache = _NOT_CACHED
         save_file_path = self.__get_current_script_path()
         if not save_file_path:
             # script has never been saved as anything!
             return
 
+        # if the script is being saved over the same file as the last save then
+        # none of the render paths will need resetting:
+        is_new_save_path = save_file_path != self.__last_save_path
+        all_paths_reset = True
+
+        # paths may be reset as part of the save so the previews will need updating:
+        self.__applied_path_previews = {}
+        self.__applied_path_warnings = {}
+
+        write_knobs_flags = nuke.WRITE_NON_DEFAULT_ONLY | nuke.TO_SCRIPT | nuke.TO_VALUE
         for n in self.get_nodes():
             # check to see if the script is being saved to a new file or the same file:
             knob = n.knob("tk_last_known_script")
             if not knob:
                 continue
 
-            last_known_path = knob.value()
-            if last_known_path:
-                # correct slashes for compare:
-                last_known_path = last_known_path.replace(os.path.sep, "/")
+            if is_new_save_path:
+                last_known_path = knob.value()
+                if last_known_path and _NEEDS_SLASH_FIX:
+                    # correct slashes for compare:
+                    last_known_path = last_known_path.replace(os.path.sep, "/")
 
-            if last_known_path != save_file_path:
-                # we're saving to a new file so reset the render path:
-                try:
-                    self.reset_render_path(n)
-                except:
-                    # don't want any exceptions to stop the save!
-                    pass
+                if last_known_path != save_file_path:
+                    # we're saving to a new file so reset the render path:
+                    try:
+                        self.reset_render_path(n)
+                    except Exception:
+                        # don't want any exceptions to stop the save!  The reset
+                        # will be retried the next time the script is saved:
+                        all_paths_reset = False
 
             # For each of our nodes, we need to keep a record of any non-default
             # knob values on the encapsulated write node. We will need this when
@@ -2216,15 +2919,97 @@ class TankWriteNodeHandler(object):
             # tk_write_node_settings for use when repopulating the file_type
             # settings on load.
             write_node = n.node(TankWriteNodeHandler.WRITE_NODE_NAME)
-            nk_data = write_node.writeKnobs(
-                nuke.WRITE_NON_DEFAULT_ONLY | nuke.TO_SCRIPT | nuke.TO_VALUE
-            )
-            knob_changes = pickle.dumps(nk_data, protocol=0)
-            self.__update_knob_value(
-                n,
-                "tk_write_node_settings",
-                base64.b64encode(knob_changes).decode(),
+            nk_data = write_node.writeKnobs(write_knobs_flags)
+            last_nk_data, encoded_settings = self.__serialized_write_node_settings.get(
+                n, (None, None)
             )
+            if nk_data != last_nk_data:
+                # the settings have changed since the last save:
+                knob_changes = pickle.dumps(nk_data, protocol=2)
+                encoded_settings = base64.b64encode(knob_changes).decode("ascii")
+                self.__serialized_write_node_settings[n] = (nk_data, encoded_settings)
+            self.__update_knob_value(n, "tk_write_node_settings", encoded_settings)
+
+        if all_paths_reset:
+            self.__last_save_path = save_file_path
+
+    def __on_script_load(self):
+        """
+        Called when a script is loaded.  Resets any state that was cached
+        for the previously open script.
+        """
+        self.__last_save_path = None
+        self.__nodes_cache = None
+        self.__script_path_cache = _NOT_CACHED
+        self.__applied_path_previews = {}
+        self.__applied_path_warnings = {}
+
+    def __on_script_close(self):
+        """
+        Called when a script is closed.  Resets any state that was cached
+        for the script.
+        """
+        self.__nodes_cache = None
+        self.__script_path_cache = _NOT_CACHED
+        self.__node_profile_names = {}
+        self.__node_profile_settings = {}
+        self.__applied_profiles = {}
+        self.__node_profile_lists = {}
+        self.__applied_path_previews = {}
+        self.__applied_path_warnings = {}
+        self.__serialized_write_node_settings = {}
+        self.__path_lock_results = {}
+        self.__node_computed_path_settings_cache = {}
+        self.__node_knobs = {}
+
+    def __on_node_create(self):
+        """
+        Called whenever a Flow Production Tracking Write node is created, including
+        when a script is loaded or nodes are pasted.
+        """
+        self.__nodes_cache = None
+
+    def __on_node_destroy(self):
+        """
+        Called whenever any node is destroyed.  Note that this is called before
+        the node is actually removed from the script.
+        """
+        node = nuke.thisNode()
+        if node.Class() == TankWriteNodeHandler.SG_WRITE_NODE_CLASS:
+            self.__forget_node(node)
+            if self.__nodes_cache is not None and node in self.__nodes_cache:
+                self.__nodes_cache.remove(node)
+        elif isinstance(node, nuke.Group):
+            # the group may contain Flow Production Tracking Write nodes
+            self.__nodes_cache = None
+
+    def __forget_node(self, node):
+        """
+        Remove anything cached for the specified node.
+
+        :param node:    The Flow Production Tracking Write node being destroyed
+        """
+        self.__forget_node_profile(node)
+        self.__applied_profiles.pop(node, None)
+        self.__node_profile_lists.pop(node, None)
+        self.__applied_path_previews.pop(node, None)
+        self.__applied_path_warnings.pop(node, None)
+        self.__serialized_write_node_settings.pop(node, None)
+        self.__path_lock_results.pop((node, False), None)
+        self.__path_lock_results.pop((node, True), None)
+        self.__node_computed_path_settings_cache.pop((node, False), None)
+        self.__node_computed_path_settings_cache.pop((node, True), None)
+        self.__node_knobs.pop(node, None)
+
+    def __forget_node_profile(self, node):
+        """
+        Remove the cached profile name and settings for the specified node so that
+        they get re-read the next time they are needed.
+
+        :param node:    The Flow Production Tracking Write node
+        """
+        self.__node_profile_names.pop(node, None)
+        self.__node_profile_settings.pop(node, None)
 
     def __on_user_create(self):
         """